@@ -5,9 +5,86 @@ import numpy as np
 import matplotlib.pyplot as plt
 import pandas as pd
 import time
-from datetime import datetime
+from datetime import datetime, timedelta
 import os
 
+try:
+    from numba import njit, prange
+except ImportError:  # Numba is optional, the kernels then run as plain Python
+    def njit(*args, **kwargs):
+        """Stand-in for numba.njit that returns the function unchanged"""
+        if len(args) == 1 and callable(args[0]):
+            return args[0]
+        return lambda func: func
+    
+    prange = range
+
+@njit(fastmath=True, cache=True)
+def _clip(x, lower, upper):
+    """Bound x to [lower, upper]; compiles to a min/max instruction pair rather than branches"""
+    return min(max(x, lower), upper)
+
+# Open-circuit voltage curve 1 - (1 - soc/100)**0.9, tabulated at whole SoC percentages; linear
+# interpolation between entries stays within 1 mV of the exact curve over the cell's voltage span
+_SOC_FACTOR_LUT = 1 - (1 - np.linspace(0, 1, 101))**0.9
+
+@njit(fastmath=True, cache=True)
+def _soc_factor(soc):
+    """Non-linear SoC factor (0 at empty, 1 at full) for a SoC in percent, from the lookup table"""
+    idx = min(max(int(soc), 0), 99)
+    frac = soc - idx
+    return _SOC_FACTOR_LUT[idx] + frac * (_SOC_FACTOR_LUT[idx + 1] - _SOC_FACTOR_LUT[idx])
+
+@njit(fastmath=True, cache=True)
+def _cell_step(current_flow, time_step, capacity, internal_resistance, inv_energy_denom, soc, temperature,
+               health, min_voltage, max_voltage, thermal_resistance, heat_capacity, thermal_decay):
+    """Advance one cell by one time step (in seconds) under the given current.
+    
+    Shared by BatteryCell.update and the pack kernels. inv_energy_denom is the
+    cached 100000 / (capacity * max_voltage), which turns an energy change in mWh
+    into a change in SoC and only changes when aging changes the capacity.
+    thermal_decay is exp(-time_step / (thermal_resistance * heat_capacity)), used
+    to cool the cell exactly while it is at rest. Returns the new (voltage, soc,
+    temperature, health, capacity, internal_resistance, inv_energy_denom)."""
+    # Update voltage based on SoC and load (simplified model), minus the drop across the internal resistance
+    soc_factor = _soc_factor(soc)  # non-linear relation
+    ambient_temp = 25.0  # degrees Celsius
+    
+    if current_flow == 0.0:
+        # At rest there is no IR drop, charge transfer, heating or aging; the cell sits at its
+        # open-circuit voltage and cools towards ambient along the exact exponential
+        voltage = _clip(min_voltage + (max_voltage - min_voltage) * soc_factor, min_voltage, max_voltage)
+        if abs(temperature - ambient_temp) > 1e-9:
+            temperature = ambient_temp + (temperature - ambient_temp) * thermal_decay
+        return voltage, soc, temperature, health, capacity, internal_resistance, inv_energy_denom
+    
+    voltage = min_voltage + (max_voltage - min_voltage) * soc_factor - current_flow * internal_resistance
+    voltage = _clip(voltage, min_voltage, max_voltage)
+    
+    # Energy drawn this step (mWh) and the resulting change in SoC
+    energy_change = current_flow * voltage * time_step / 3600
+    soc_change = energy_change * inv_energy_denom
+    soc = _clip(soc - soc_change, 0.0, 100.0)
+    
+    # Thermal model: I²R heating against cooling to ambient
+    heat_generation = current_flow**2 * internal_resistance
+    cooling_effect = (temperature - ambient_temp) / thermal_resistance
+    temperature += (heat_generation - cooling_effect) * time_step / heat_capacity
+    
+    # Update cell health (simplified aging model)
+    if current_flow < 0:  # Only count discharge
+        cycle_wear = abs(soc_change) / 100 * 0.002  # 0.2% degradation per full cycle
+        temp_stress = max(0.0, (temperature - 35) / 10) * 0.01  # temperature stress
+        health = max(health - cycle_wear - temp_stress, 0.0)
+        
+        # As health decreases, increase internal resistance and decrease capacity
+        capacity_factor = 0.7 + 0.3 * (health / 100)  # capacity falls to 70% at end of life
+        capacity = 3200 * capacity_factor
+        inv_energy_denom = 100000 / (capacity * max_voltage)
+        internal_resistance = 0.02 * (2 - capacity_factor)  # resistance increases as health decreases
+    
+    return voltage, soc, temperature, health, capacity, internal_resistance, inv_energy_denom
+
 class BatteryCell:
     """Simulation of an individual battery cell with realistic parameters"""
     
@@ -36,49 +113,19 @@ class BatteryCell:
         # Random variations to simulate real-world differences
         self.capacity *= (1 + np.random.normal(0, 0.03))  # 3% variation
         self.internal_resistance *= (1 + np.random.normal(0, 0.05))  # 5% variation
+        self._inv_energy_denom = 100000 / (self.capacity * self.max_voltage)  # SoC % per mWh
     
     def update(self, current_flow, time_step):
         """Update battery state based on current draw and time step (in seconds)"""
         self.current_flow = current_flow
         
-        # Calculate voltage drop due to internal resistance
-        voltage_drop = current_flow * self.internal_resistance
-        
-        # Update voltage based on SoC and load (simplified model)
-        soc_factor = 1 - (1 - self.state_of_charge/100)**0.9  # non-linear relation
-        self.current_voltage = self.min_voltage + (self.max_voltage - self.min_voltage) * soc_factor - voltage_drop
-        
-        # Bound voltage
-        self.current_voltage = max(min(self.current_voltage, self.max_voltage), self.min_voltage)
-        
-        # Calculate energy
-        energy_change = current_flow * self.current_voltage * time_step / 3600  # in mWh
-        
-        # Update state of charge
-        soc_change = energy_change / (self.capacity * self.max_voltage / 1000) * 100
-        self.state_of_charge -= soc_change
-        self.state_of_charge = max(min(self.state_of_charge, 100), 0)
-        
-        # Calculate heat generation (I²R losses)
-        heat_generation = current_flow**2 * self.internal_resistance
-        
-        # Update temperature using thermal model
-        ambient_temp = 25  # degrees Celsius
-        cooling_effect = (self.temperature - ambient_temp) / self.thermal_resistance
-        temp_change = (heat_generation - cooling_effect) * time_step / self.heat_capacity
-        self.temperature += temp_change
-        
-        # Update cell health (simplified aging model)
-        if current_flow < 0:  # Only count discharge
-            cycle_wear = abs(soc_change) / 100 * 0.002  # 0.2% degradation per full cycle
-            temp_stress = max(0, (self.temperature - 35) / 10) * 0.01  # temperature stress
-            self.health -= cycle_wear + temp_stress
-            self.health = max(self.health, 0)
-            
-            # As health decreases, increase internal resistance and decrease capacity
-            capacity_factor = 0.7 + 0.3 * (self.health / 100)  # capacity falls to 70% at end of life
-            self.capacity = 3200 * capacity_factor
-            self.internal_resistance = 0.02 * (2 - capacity_factor)  # resistance increases as health decreases
+        (self.current_voltage, self.state_of_charge, self.temperature, self.health,
+         self.capacity, self.internal_resistance, self._inv_energy_denom) = _cell_step(
+            float(current_flow), float(time_step), float(self.capacity), float(self.internal_resistance),
+            float(self._inv_energy_denom), float(self.state_of_charge), float(self.temperature), float(self.health),
+            float(self.min_voltage), float(self.max_voltage),
+            float(self.thermal_resistance), float(self.heat_capacity),
+            np.exp(-time_step / (self.thermal_resistance * self.heat_capacity)))
         
         return {
             'voltage': self.current_voltage,
@@ -87,107 +134,441 @@ class BatteryCell:
             'health': self.health
         }
 
+# fastmath=True without the no-NaN/no-Inf assumptions, which would let LLVM miscompile the
+# reductions in _pack_step that start from +/-inf
+_INF_SAFE_FASTMATH = {'contract', 'afn', 'reassoc', 'arcp', 'nsz'}
+
+@njit(fastmath=_INF_SAFE_FASTMATH, cache=True)
+def _pack_step(capacity, internal_resistance, inv_energy_denom, soc, temperature, health, voltage,
+               current_per_cell, time_step, min_voltage, max_voltage,
+               thermal_resistance, heat_capacity):
+    """Advance every cell of a pack by one time step (flattened cell arrays, updated in place).
+    
+    The pack reductions are accumulated in the same pass and returned as
+    (min voltage, max voltage, voltage sum, min temperature, max temperature,
+    temperature sum, SoC sum, health sum)."""
+    thermal_decay = np.exp(-time_step / (thermal_resistance * heat_capacity))
+    vmin = tmin = np.inf
+    vmax = tmax = -np.inf
+    vsum = tsum = soc_sum = health_sum = 0.0
+    for k in range(capacity.size):
+        (v, soc[k], temperature[k], health[k], capacity[k], internal_resistance[k],
+         inv_energy_denom[k]) = _cell_step(
+            current_per_cell, time_step, capacity[k], internal_resistance[k], inv_energy_denom[k],
+            soc[k], temperature[k], health[k], min_voltage, max_voltage, thermal_resistance, heat_capacity,
+            thermal_decay)
+        voltage[k] = v
+        
+        # Pack level reductions
+        vmin = min(vmin, v)
+        vmax = max(vmax, v)
+        vsum += v
+        tmin = min(tmin, temperature[k])
+        tmax = max(tmax, temperature[k])
+        tsum += temperature[k]
+        soc_sum += soc[k]
+        health_sum += health[k]
+    
+    return vmin, vmax, vsum, tmin, tmax, tsum, soc_sum, health_sum
+
+@njit(cache=True)
+def _charge_current(pack_soc, max_temperature, temperature_limit, max_soc):
+    """BMS charging current for the given pack state, and whether charging continues"""
+    # Determine charging current based on SoC and temperature
+    base_charge_current = 10.0  # Amperes
+    
+    # Reduce current at high SoC
+    if pack_soc > 80:
+        base_charge_current *= (90 - pack_soc) / 10
+    
+    # Reduce current at high temperature
+    if max_temperature > 35:
+        temp_factor = max(0.0, (temperature_limit - max_temperature) / 10)
+        base_charge_current *= temp_factor
+    
+    # Stop charging if SoC is at max
+    if pack_soc >= max_soc:
+        return 0.0, False
+    
+    return max(0.0, base_charge_current), True  # Ensure positive current
+
+@njit(cache=True)
+def _discharge_current(pack_soc, max_temperature, requested_current, temperature_limit, min_soc):
+    """BMS discharge current (negative) allowed for the requested current and pack state"""
+    # Limit current based on SoC
+    if pack_soc < 20:
+        max_current = requested_current * (pack_soc / 20)
+    else:
+        max_current = requested_current
+    
+    # Limit current based on temperature
+    if max_temperature > 40:
+        temp_factor = max(0.0, (temperature_limit - max_temperature) / 5)
+        max_current *= temp_factor
+    
+    # Stop discharging if SoC is at min
+    if pack_soc <= min_soc:
+        return 0.0
+    
+    return 0.0 - min(abs(max_current), requested_current)  # Ensure negative current (discharge), +0.0 at rest
+
+# BMS warning flags, one bit per message in the order BatteryManagementSystem.monitor checks them
+WARN_HIGH_TEMPERATURE = 1 << 0
+FAULT_TEMPERATURE = 1 << 1
+WARN_IMBALANCE = 1 << 2
+FAULT_IMBALANCE = 1 << 3
+WARN_LOW_VOLTAGE = 1 << 4
+FAULT_LOW_VOLTAGE = 1 << 5
+WARN_HIGH_VOLTAGE = 1 << 6
+FAULT_HIGH_VOLTAGE = 1 << 7
+WARN_LOW_SOC = 1 << 8
+FAULT_FLAGS = FAULT_TEMPERATURE | FAULT_IMBALANCE | FAULT_LOW_VOLTAGE | FAULT_HIGH_VOLTAGE
+
+# Message for each flag, formatted with the status fields only when warnings are displayed
+WARNING_MESSAGES = (
+    (WARN_HIGH_TEMPERATURE, "WARNING: High temperature detected: {max_temperature:.1f}°C"),
+    (FAULT_TEMPERATURE, "FAULT: Critical temperature exceeded!"),
+    (WARN_IMBALANCE, "WARNING: Cell imbalance detected: {voltage_imbalance:.2f}V"),
+    (FAULT_IMBALANCE, "FAULT: Critical cell imbalance!"),
+    (WARN_LOW_VOLTAGE, "WARNING: Low cell voltage: {min_cell_voltage:.2f}V"),
+    (FAULT_LOW_VOLTAGE, "FAULT: Critical low cell voltage!"),
+    (WARN_HIGH_VOLTAGE, "WARNING: High cell voltage: {max_cell_voltage:.2f}V"),
+    (FAULT_HIGH_VOLTAGE, "FAULT: Critical high cell voltage!"),
+    (WARN_LOW_SOC, "WARNING: Low state of charge: {pack_soc:.1f}%")
+)
+
+def _warning_flags(max_temperature, voltage_imbalance, min_cell_voltage, max_cell_voltage, pack_soc,
+                   temperature_limit, imbalance_limit, min_voltage_limit, max_voltage_limit, min_soc):
+    """Warning flags raised by a pack state against the BMS safety thresholds"""
+    flags = 0
+    
+    # Check temperature
+    if max_temperature > temperature_limit:
+        flags |= WARN_HIGH_TEMPERATURE
+        if max_temperature > temperature_limit + 10:
+            flags |= FAULT_TEMPERATURE
+    
+    # Check voltage imbalance
+    if voltage_imbalance > imbalance_limit:
+        flags |= WARN_IMBALANCE
+        if voltage_imbalance > imbalance_limit * 2:
+            flags |= FAULT_IMBALANCE
+    
+    # Check cell voltages
+    if min_cell_voltage < min_voltage_limit:
+        flags |= WARN_LOW_VOLTAGE
+        if min_cell_voltage < min_voltage_limit - 0.2:
+            flags |= FAULT_LOW_VOLTAGE
+    
+    if max_cell_voltage > max_voltage_limit:
+        flags |= WARN_HIGH_VOLTAGE
+        if max_cell_voltage > max_voltage_limit + 0.1:
+            flags |= FAULT_HIGH_VOLTAGE
+    
+    # Check SoC
+    if pack_soc < min_soc:
+        flags |= WARN_LOW_SOC
+    return flags
+
+# Compiled copy for the simulation kernels. BatteryManagementSystem.monitor calls the Python
+# function, since for a single state a Numba dispatch costs more than the comparisons themselves
+_warning_flags_jit = njit(cache=True)(_warning_flags)
+
+@njit(cache=True)
+def _simulate(requested_current, time_step, capacity, internal_resistance, inv_energy_denom,
+              soc, temperature, health, voltage, cells_in_parallel, min_voltage, max_voltage,
+              thermal_resistance, heat_capacity,
+              pack_soc, max_temp, fault, temperature_limit, imbalance_limit, min_voltage_limit,
+              max_voltage_limit, min_soc, max_soc, log_buffer, log_seconds, start, start_seconds, is_charging,
+              warning_flags):
+    """Step a pack through a sequence of requested currents under the BMS control law.
+    
+    Each step mirrors one pass of the run_simulation loop: the BMS picks the actual current from
+    the previous pack state, the cells are advanced, and the pack metrics are written to column
+    start + t of the log buffer (rows in LOG_FIELDS order) with the simulated time in log_seconds.
+    The BMS charging flag and the warning flags of each step go to is_charging[t] and
+    warning_flags[t]. Returns the BMS fault state after the last step."""
+    for t in range(requested_current.size):
+        # Determine actual current based on BMS controls
+        if fault:
+            current = 0.0
+            is_charging[t] = requested_current[t] > 0
+        elif requested_current[t] > 0:
+            current, is_charging[t] = _charge_current(pack_soc, max_temp, temperature_limit, max_soc)
+        else:
+            current = _discharge_current(pack_soc, max_temp, abs(requested_current[t]),
+                                         temperature_limit, min_soc)
+            is_charging[t] = False
+        
+        vmin, vmax, vsum, tmin, max_temp, tsum, soc_sum, health_sum = _pack_step(
+            capacity, internal_resistance, inv_energy_denom, soc, temperature, health, voltage,
+            current / cells_in_parallel, time_step, min_voltage, max_voltage,
+            thermal_resistance, heat_capacity)
+        pack_soc = soc_sum / soc.size
+        
+        # Log data
+        i = start + t
+        log_seconds[i] = start_seconds + (t + 1) * int(time_step)
+        log_buffer[0, i] = vsum / cells_in_parallel  # average series string voltage
+        log_buffer[1, i] = current
+        log_buffer[2, i] = pack_soc
+        log_buffer[3, i] = vmin
+        log_buffer[4, i] = vmax
+        log_buffer[5, i] = vmax - vmin
+        log_buffer[6, i] = tmin
+        log_buffer[7, i] = max_temp
+        log_buffer[8, i] = tsum / temperature.size
+        log_buffer[9, i] = health_sum / health.size
+        
+        flags = _warning_flags_jit(max_temp, vmax - vmin, vmin, vmax, pack_soc, temperature_limit,
+                                   imbalance_limit, min_voltage_limit, max_voltage_limit, min_soc)
+        warning_flags[t] = flags
+        fault = (flags & FAULT_FLAGS) != 0
+    
+    return fault
+
+@njit(parallel=True, cache=True)
+def _simulate_batch(requested_current, time_step, capacity, internal_resistance, inv_energy_denom,
+                    soc, temperature, health, voltage, cell_offsets, cells_in_parallel, min_voltage,
+                    max_voltage, thermal_resistance, heat_capacity, pack_soc, max_temp, fault,
+                    limits, log_buffers, log_seconds, is_charging, warning_flags):
+    """Run _simulate for several independent packs in parallel, one pack per thread.
+    
+    The cells of pack p are elements cell_offsets[p]:cell_offsets[p + 1] of the
+    concatenated cell arrays; the other arguments hold one entry (or one log) per pack.
+    limits rows are (max temperature, max imbalance, min cell voltage, max cell voltage,
+    min SoC, max SoC). fault is updated in place with each pack's final fault state."""
+    for p in prange(cell_offsets.size - 1):
+        lo, hi = cell_offsets[p], cell_offsets[p + 1]
+        fault[p] = _simulate(requested_current, time_step, capacity[lo:hi], internal_resistance[lo:hi],
+                             inv_energy_denom[lo:hi], soc[lo:hi], temperature[lo:hi], health[lo:hi],
+                             voltage[lo:hi], cells_in_parallel[p], min_voltage[p], max_voltage[p],
+                             thermal_resistance[p], heat_capacity[p], pack_soc[p], max_temp[p], fault[p],
+                             limits[p, 0], limits[p, 1], limits[p, 2], limits[p, 3], limits[p, 4],
+                             limits[p, 5], log_buffers[p], log_seconds[p], 0, 0, is_charging[p],
+                             warning_flags[p])
+
+# Storage type for the per-cell pack arrays and the pack log. Single precision is ample for the
+# model's accuracy and halves memory traffic; the kernels still do their arithmetic in double
+# precision. Cell health and temperature stay float64: health decrements and the last of the
+# cooling towards ambient (below ~3e-5 °C) fall below float32 resolution. The BMS limits are
+# checked on the unrounded metrics inside _simulate, which hands its warning flags to monitor().
+STATE_DTYPE = np.float32
+
+# Per-step quantities logged by BatteryPack, in CSV column order
+LOG_FIELDS = ('pack_voltage', 'pack_current', 'pack_soc', 'min_cell_voltage', 'max_cell_voltage',
+              'voltage_imbalance', 'min_temperature', 'max_temperature', 'avg_temperature', 'pack_health')
+
 class BatteryPack:
     """Simulation of a battery pack consisting of multiple cells"""
     
-    def __init__(self, cells_in_series=10, cells_in_parallel=5):
-        """Initialize a battery pack with specified configuration"""
+    def __init__(self, cells_in_series=10, cells_in_parallel=5, seed=None):
+        """Initialize a battery pack with specified configuration (seed fixes the cell variations)"""
         self.cells_in_series = cells_in_series
         self.cells_in_parallel = cells_in_parallel
         self.total_cells = cells_in_series * cells_in_parallel
-        
-        # Create individual cells
-        self.cells = []
-        for i in range(self.total_cells):
-            # Add slight variations to cells to simulate manufacturing differences
-            cycle_count = np.random.randint(0, 20)  # Some cells might have different cycle counts
-            self.cells.append(BatteryCell(cycle_count=cycle_count))
-        
-        # Organize cells in series-parallel configuration
-        self.cell_matrix = np.array(self.cells).reshape(cells_in_series, cells_in_parallel)
+        shape = (cells_in_series, cells_in_parallel)
+        
+        # Cell parameters (Li-ion defaults, same as BatteryCell)
+        self.max_voltage = 4.2  # in volts
+        self.min_voltage = 2.8  # in volts
+        self.current_rating = 10  # in amperes
+        self.thermal_resistance = 10.0  # K/W
+        self.heat_capacity = 200.0  # J/K
+        
+        # Cell properties stored as (series, parallel) arrays, one element per cell
+        # Add slight variations to cells to simulate manufacturing differences
+        rng = np.random.default_rng(seed)
+        self.capacity = 3200 * (1 + 0.03 * rng.standard_normal(shape, dtype=STATE_DTYPE))  # in mAh, 3% variation
+        self.internal_resistance = 0.02 * (1 + 0.05 * rng.standard_normal(shape, dtype=STATE_DTYPE))  # in ohms, 5% variation
+        self.cycle_count = rng.integers(0, 20, shape)  # Some cells might have different cycle counts
+        self._inv_energy_denom = (100000 / (self.capacity * self.max_voltage)).astype(STATE_DTYPE)  # SoC % per mWh, refreshed on aging
+        
+        # Cell state variables
+        self.voltage = np.full(shape, self.max_voltage, dtype=STATE_DTYPE)  # start fully charged
+        self.soc = np.full(shape, 100.0, dtype=STATE_DTYPE)  # percentage
+        self.temperature = np.full(shape, 25.0)  # degrees Celsius
+        self.health = np.full(shape, 100.0)  # percentage
         
         # Pack level properties
-        self.pack_voltage = cells_in_series * self.cells[0].max_voltage
-        self.pack_capacity = cells_in_parallel * self.cells[0].capacity  # in mAh
-        
-        # Logging data
-        self.data_log = {
-            'timestamp': [],
-            'pack_voltage': [],
-            'pack_current': [],
-            'pack_soc': [],
-            'min_cell_voltage': [],
-            'max_cell_voltage': [],
-            'voltage_imbalance': [],
-            'min_temperature': [],
-            'max_temperature': [],
-            'avg_temperature': [],
-            'pack_health': []
+        self.pack_voltage = cells_in_series * self.max_voltage
+        self.pack_capacity = cells_in_parallel * self.capacity[0, 0]  # in mAh
+        
+        # Logging data, preallocated for one day of one-minute steps (see prealloc_log)
+        self.sim_time = 0  # seconds simulated so far
+        self._t0 = datetime.now()  # wall-clock time the simulation started
+        self._i = 0  # number of logged steps
+        self._log_buffer = np.empty((len(LOG_FIELDS), 0), dtype=STATE_DTYPE)
+        self._sim_seconds = np.empty(0, dtype=np.int32)
+        self.prealloc_log(24 * 60)
+        
+        # Latest pack state, allocated once and updated in place by update()
+        self._pack_state = {
+            'sim_seconds': self.sim_time,
+            'pack_voltage': self.pack_voltage,
+            'pack_soc': 100.0,
+            'min_cell_voltage': self.max_voltage,
+            'max_cell_voltage': self.max_voltage,
+            'voltage_imbalance': 0.0,
+            'min_temperature': 25.0,
+            'max_temperature': 25.0,
+            'avg_temperature': 25.0,
+            'pack_health': 100.0
         }
     
     def update(self, pack_current, time_step):
         """Update all cells in the pack with the given current"""
-        # Distribute current among parallel cells (ideally equal, but adjust based on cell resistance)
-        cell_voltages = np.zeros((self.cells_in_series, self.cells_in_parallel))
-        cell_temperatures = np.zeros((self.cells_in_series, self.cells_in_parallel))
-        cell_socs = np.zeros((self.cells_in_series, self.cells_in_parallel))
-        cell_healths = np.zeros((self.cells_in_series, self.cells_in_parallel))
-        
         # Current per cell (assuming perfect current sharing for simplicity)
         current_per_cell = pack_current / self.cells_in_parallel
         
-        # Update each cell
-        for i in range(self.cells_in_series):
-            for j in range(self.cells_in_parallel):
-                cell_state = self.cell_matrix[i, j].update(current_per_cell, time_step)
-                cell_voltages[i, j] = cell_state['voltage']
-                cell_temperatures[i, j] = cell_state['temperature']
-                cell_socs[i, j] = cell_state['soc']
-                cell_healths[i, j] = cell_state['health']
-        
-        # Calculate series string voltages (sum voltages in each series)
-        series_voltages = np.sum(cell_voltages, axis=0)
+        # Advance all cells in one compiled pass over flattened views of the cell arrays,
+        # which also returns the pack level reductions
+        vmin, vmax, vsum, tmin, tmax, tsum, soc_sum, health_sum = _pack_step(
+            self.capacity.ravel(), self.internal_resistance.ravel(), self._inv_energy_denom.ravel(), self.soc.ravel(),
+            self.temperature.ravel(), self.health.ravel(), self.voltage.ravel(),
+            float(current_per_cell), float(time_step), self.min_voltage, self.max_voltage,
+            self.thermal_resistance, self.heat_capacity)
+        tavg = tsum / self.total_cells
         
-        # Calculate pack voltage (average of series string voltages for simplicity)
-        self.pack_voltage = np.mean(series_voltages)
+        # Calculate pack voltage (average of series string voltages for simplicity), which is
+        # cells_in_series times the mean cell voltage
+        self.pack_voltage = self.cells_in_series * vsum / self.total_cells
         
         # Calculate pack SoC (average of all cells)
-        self.pack_soc = np.mean(cell_socs)
+        self.pack_soc = soc_sum / self.total_cells
         
         # Calculate health metrics
-        self.pack_health = np.mean(cell_healths)
+        self.pack_health = health_sum / self.total_cells
         
         # Log data
-        self.data_log['timestamp'].append(datetime.now())
-        self.data_log['pack_voltage'].append(self.pack_voltage)
-        self.data_log['pack_current'].append(pack_current)
-        self.data_log['pack_soc'].append(self.pack_soc)
-        self.data_log['min_cell_voltage'].append(np.min(cell_voltages))
-        self.data_log['max_cell_voltage'].append(np.max(cell_voltages))
-        self.data_log['voltage_imbalance'].append(np.max(cell_voltages) - np.min(cell_voltages))
-        self.data_log['min_temperature'].append(np.min(cell_temperatures))
-        self.data_log['max_temperature'].append(np.max(cell_temperatures))
-        self.data_log['avg_temperature'].append(np.mean(cell_temperatures))
-        self.data_log['pack_health'].append(self.pack_health)
-        
-        return {
-            'pack_voltage': self.pack_voltage,
-            'pack_soc': self.pack_soc,
-            'min_cell_voltage': np.min(cell_voltages),
-            'max_cell_voltage': np.max(cell_voltages),
-            'voltage_imbalance': np.max(cell_voltages) - np.min(cell_voltages),
-            'min_temperature': np.min(cell_temperatures),
-            'max_temperature': np.max(cell_temperatures),
-            'avg_temperature': np.mean(cell_temperatures),
-            'pack_health': self.pack_health
-        }
+        self.sim_time += time_step
+        if self._i == self._sim_seconds.size:
+            self.prealloc_log(max(1, 2 * self._i))
+        i = self._i
+        log = self._log
+        log['sim_seconds'][i] = self.sim_time
+        log['pack_voltage'][i] = self.pack_voltage
+        log['pack_current'][i] = pack_current
+        log['pack_soc'][i] = self.pack_soc
+        log['min_cell_voltage'][i] = vmin
+        log['max_cell_voltage'][i] = vmax
+        log['voltage_imbalance'][i] = vmax - vmin
+        log['min_temperature'][i] = tmin
+        log['max_temperature'][i] = tmax
+        log['avg_temperature'][i] = tavg
+        log['pack_health'][i] = self.pack_health
+        self._i = i + 1
+        
+        # Refresh the pack state in place (the same dict is returned every step)
+        ps = self._pack_state
+        ps['sim_seconds'] = self.sim_time
+        ps['pack_voltage'] = self.pack_voltage
+        ps['pack_soc'] = self.pack_soc
+        ps['min_cell_voltage'] = vmin
+        ps['max_cell_voltage'] = vmax
+        ps['voltage_imbalance'] = vmax - vmin
+        ps['min_temperature'] = tmin
+        ps['max_temperature'] = tmax
+        ps['avg_temperature'] = tavg
+        ps['pack_health'] = self.pack_health
+        return ps
+    
+    def get_state(self):
+        """Return the pack state from the most recent update without advancing the simulation"""
+        return self._pack_state
+    
+    def simulate(self, requested_current, time_step, bms):
+        """Run the pack through a sequence of requested currents (one per time step) in one compiled
+        loop, with the current limited by the BMS control law. Returns the BMS charging flag and the
+        warning flags (see WARNING_MESSAGES) per step, as checked on the unrounded pack metrics; the
+        BMS is left with the fault and charging state after the last step."""
+        requested_current = np.asarray(requested_current, dtype=np.float64)
+        n_steps = requested_current.size
+        start = self._i
+        if start + n_steps > self._sim_seconds.size:
+            self.prealloc_log(start + n_steps)
+        is_charging = np.zeros(n_steps, dtype=np.bool_)
+        warning_flags = np.zeros(n_steps, dtype=np.uint16)
+        
+        fault = _simulate(requested_current, float(time_step), self.capacity.ravel(), self.internal_resistance.ravel(),
+                          self._inv_energy_denom.ravel(), self.soc.ravel(), self.temperature.ravel(), self.health.ravel(), self.voltage.ravel(),
+                          self.cells_in_parallel, self.min_voltage, self.max_voltage,
+                          self.thermal_resistance, self.heat_capacity,
+                          float(self._pack_state['pack_soc']), float(self._pack_state['max_temperature']),
+                          bool(bms.fault_detected), float(bms.max_temperature), float(bms.max_voltage_imbalance),
+                          float(bms.min_cell_voltage), float(bms.max_cell_voltage), float(bms.min_soc), float(bms.max_soc),
+                          self._log_buffer, self._sim_seconds, start, int(self.sim_time), is_charging,
+                          warning_flags)
+        
+        # Hand the control state back to the BMS, so a following call or step continues from it
+        bms.fault_detected = bool(fault)
+        if n_steps:
+            bms.is_charging = bool(is_charging[-1])
+        
+        self._advance_log(n_steps)
+        return is_charging, warning_flags
+    
+    def _advance_log(self, n_steps):
+        """Account for n_steps written to the log by a compiled kernel and pick up the pack state
+        after the last of them"""
+        self._i += n_steps
+        if n_steps:
+            self._pack_state.update(self.logged_state(self._i - 1))
+            self.sim_time = self._pack_state['sim_seconds']
+            self.pack_voltage = self._pack_state['pack_voltage']
+            self.pack_soc = self._pack_state['pack_soc']
+            self.pack_health = self._pack_state['pack_health']
+    
+    def logged_state(self, step):
+        """Return the pack state logged at the given step, in the form returned by update()"""
+        return {field: self._log[field][step] for field in self._pack_state}
+    
+    def prealloc_log(self, n_steps):
+        """Reserve log storage for n_steps updates, keeping any steps already logged"""
+        n_steps = max(n_steps, self._i)
+        buffer = np.empty((len(LOG_FIELDS), n_steps), dtype=STATE_DTYPE)
+        buffer[:, :self._i] = self._log_buffer[:, :self._i]
+        sim_seconds = np.empty(n_steps, dtype=np.int32)
+        sim_seconds[:self._i] = self._sim_seconds[:self._i]
+        self._bind_log(buffer, sim_seconds)
+    
+    def _bind_log(self, buffer, sim_seconds):
+        """Use the given (fields, steps) buffer and sim_seconds array as log storage"""
+        self._log_buffer = buffer
+        self._sim_seconds = sim_seconds
+        self._log = {'sim_seconds': sim_seconds}
+        self._log.update((field, buffer[k]) for k, field in enumerate(LOG_FIELDS))
+    
+    @property
+    def data_log(self):
+        """Logged data for the steps simulated so far, as a dict of arrays keyed by field"""
+        return {field: values[:self._i] for field, values in self._log.items()}
     
     def log_to_csv(self, filename='battery_data.csv'):
         """Save logged data to CSV file"""
-        df = pd.DataFrame(self.data_log)
+        # Wrap the log buffer as a single block without copying, then prepend the time columns
+        df = pd.DataFrame(self._log_buffer[:, :self._i].T, columns=list(LOG_FIELDS), copy=False)
+        sim_seconds = self._sim_seconds[:self._i]
+        df.insert(0, 'sim_seconds', sim_seconds)
+        df.insert(0, 'timestamp', pd.Timestamp(self._t0) + pd.to_timedelta(sim_seconds, unit='s'))
         df.to_csv(filename, index=False)
         print(f"Data saved to {filename}")
 
+# Per-step status recorded by BatteryManagementSystem.monitor, as a record dtype in field order
+STATUS_DTYPE = np.dtype([
+    ('sim_seconds', np.int32),
+    ('pack_soc', np.float64),
+    ('pack_voltage', np.float64),
+    ('max_temperature', np.float64),
+    ('voltage_imbalance', np.float64),
+    ('min_cell_voltage', np.float64),
+    ('max_cell_voltage', np.float64),
+    ('is_charging', np.bool_),
+    ('warning_flags', np.uint16),
+    ('fault_detected', np.bool_),
+    ('pack_health', np.float64)
+])
+
 class BatteryManagementSystem:
     """Battery Management System for monitoring and controlling a battery pack"""
     
@@ -196,7 +577,6 @@ class BatteryManagementSystem:
         self.battery_pack = battery_pack
         self.is_charging = False
         self.fault_detected = False
-        self.warnings = []
         
         # Safety thresholds
         self.max_temperature = 45  # degrees Celsius
@@ -206,65 +586,69 @@ class BatteryManagementSystem:
         self.min_soc = 10  # percentage
         self.max_soc = 90  # percentage (avoid full charge for longevity)
         
-        # Log data
-        self.status_log = []
+        # Log data, one status dict per step (in STATUS_DTYPE field order, see status_log)
+        self._status_rows = []
         
         # Create log directory
         if not os.path.exists('logs'):
             os.makedirs('logs')
     
-    def monitor(self, pack_state):
-        """Monitor battery pack parameters and detect faults"""
-        self.warnings = []
-        self.fault_detected = False
-        
-        # Check temperature
-        if pack_state['max_temperature'] > self.max_temperature:
-            self.warnings.append(f"WARNING: High temperature detected: {pack_state['max_temperature']:.1f}°C")
-            if pack_state['max_temperature'] > self.max_temperature + 10:
-                self.fault_detected = True
-                self.warnings.append("FAULT: Critical temperature exceeded!")
-        
-        # Check voltage imbalance
-        if pack_state['voltage_imbalance'] > self.max_voltage_imbalance:
-            self.warnings.append(f"WARNING: Cell imbalance detected: {pack_state['voltage_imbalance']:.2f}V")
-            if pack_state['voltage_imbalance'] > self.max_voltage_imbalance * 2:
-                self.fault_detected = True
-                self.warnings.append("FAULT: Critical cell imbalance!")
-        
-        # Check cell voltages
-        if pack_state['min_cell_voltage'] < self.min_cell_voltage:
-            self.warnings.append(f"WARNING: Low cell voltage: {pack_state['min_cell_voltage']:.2f}V")
-            if pack_state['min_cell_voltage'] < self.min_cell_voltage - 0.2:
-                self.fault_detected = True
-                self.warnings.append("FAULT: Critical low cell voltage!")
-        
-        if pack_state['max_cell_voltage'] > self.max_cell_voltage:
-            self.warnings.append(f"WARNING: High cell voltage: {pack_state['max_cell_voltage']:.2f}V")
-            if pack_state['max_cell_voltage'] > self.max_cell_voltage + 0.1:
-                self.fault_detected = True
-                self.warnings.append("FAULT: Critical high cell voltage!")
-        
-        # Check SoC
-        if pack_state['pack_soc'] < self.min_soc:
-            self.warnings.append(f"WARNING: Low state of charge: {pack_state['pack_soc']:.1f}%")
+    def monitor(self, pack_state, flags=None):
+        """Monitor battery pack parameters and detect faults.
+        
+        flags are the warning flags already checked for this state, e.g. by BatteryPack.simulate on
+        the unrounded metrics behind a logged state; they are computed from pack_state if omitted."""
+        if flags is None:
+            flags = _warning_flags(pack_state['max_temperature'], pack_state['voltage_imbalance'],
+                                   pack_state['min_cell_voltage'], pack_state['max_cell_voltage'],
+                                   pack_state['pack_soc'], self.max_temperature, self.max_voltage_imbalance,
+                                   self.min_cell_voltage, self.max_cell_voltage, self.min_soc)
+        self.fault_detected = (flags & FAULT_FLAGS) != 0
         
         # Log status
         status = {
-            'timestamp': datetime.now(),
+            'sim_seconds': pack_state['sim_seconds'],
             'pack_soc': pack_state['pack_soc'],
             'pack_voltage': pack_state['pack_voltage'],
             'max_temperature': pack_state['max_temperature'],
             'voltage_imbalance': pack_state['voltage_imbalance'],
+            'min_cell_voltage': pack_state['min_cell_voltage'],
+            'max_cell_voltage': pack_state['max_cell_voltage'],
             'is_charging': self.is_charging,
-            'warnings': self.warnings,
+            'warning_flags': flags,
             'fault_detected': self.fault_detected,
             'pack_health': pack_state['pack_health']
         }
-        self.status_log.append(status)
+        self._status_rows.append(status)
         
         return status
     
+    @staticmethod
+    def decode_warnings(status):
+        """Warning and fault messages for a status (as returned by monitor, or a status_log record)"""
+        flags = int(status['warning_flags'])
+        if not flags:
+            return []
+        fields = {field: status[field] for field in STATUS_DTYPE.names}
+        return [message.format(**fields) for flag, message in WARNING_MESSAGES if flags & flag]
+    
+    @property
+    def warnings(self):
+        """Warning and fault messages from the most recent monitor() call"""
+        if not self._status_rows:
+            return []
+        return self.decode_warnings(self._status_rows[-1])
+    
+    @property
+    def status_log(self):
+        """Logged status for the steps monitored so far, as a record array indexed by field name.
+        
+        The array is rebuilt from the per-step status dicts on every access (a few ms per
+        1000 steps), so read it once and keep the result rather than indexing it in a loop."""
+        fields = STATUS_DTYPE.names
+        return np.array([tuple(status[field] for field in fields) for status in self._status_rows],
+                        dtype=STATUS_DTYPE)
+    
     def control_charging(self, pack_state):
         """Determine charging parameters based on pack state"""
         if self.fault_detected:
@@ -273,46 +657,17 @@ class BatteryManagementSystem:
         if not self.is_charging:
             return 0
         
-        # Determine charging current based on SoC and temperature
-        base_charge_current = 10  # Amperes
-        
-        # Reduce current at high SoC
-        if pack_state['pack_soc'] > 80:
-            base_charge_current *= (90 - pack_state['pack_soc']) / 10
-        
-        # Reduce current at high temperature
-        if pack_state['max_temperature'] > 35:
-            temp_factor = max(0, (self.max_temperature - pack_state['max_temperature']) / 10)
-            base_charge_current *= temp_factor
-        
-        # Stop charging if SoC is at max
-        if pack_state['pack_soc'] >= self.max_soc:
-            self.is_charging = False
-            return 0
-            
-        return max(0, base_charge_current)  # Ensure positive current
+        current, self.is_charging = _charge_current(pack_state['pack_soc'], pack_state['max_temperature'],
+                                                    self.max_temperature, self.max_soc)
+        return current
     
     def control_discharging(self, pack_state, requested_current):
         """Determine if requested discharge current is safe"""
         if self.fault_detected:
             return 0  # No discharging during faults
         
-        # Limit current based on SoC
-        if pack_state['pack_soc'] < 20:
-            max_current = requested_current * (pack_state['pack_soc'] / 20)
-        else:
-            max_current = requested_current
-        
-        # Limit current based on temperature
-        if pack_state['max_temperature'] > 40:
-            temp_factor = max(0, (self.max_temperature - pack_state['max_temperature']) / 5)
-            max_current *= temp_factor
-        
-        # Stop discharging if SoC is at min
-        if pack_state['pack_soc'] <= self.min_soc:
-            return 0
-            
-        return -min(abs(max_current), requested_current)  # Ensure negative current (discharge)
+        return _discharge_current(pack_state['pack_soc'], pack_state['max_temperature'], requested_current,
+                                  self.max_temperature, self.min_soc)
     
     def balance_cells(self, pack_state):
         """Calculate cell balancing requirements"""
@@ -331,12 +686,15 @@ class BatteryManagementSystem:
             f.write("===== Battery Management System Report =====\n")
             f.write(f"Report generated: {datetime.now()}\n\n")
             
+            status_log = self.status_log
+            n_steps = status_log.size
+            
             # Overall statistics
-            if len(self.status_log) > 0:
-                avg_soc = np.mean([s['pack_soc'] for s in self.status_log])
-                avg_temp = np.mean([s['max_temperature'] for s in self.status_log])
-                avg_imbalance = np.mean([s['voltage_imbalance'] for s in self.status_log])
-                latest_health = self.status_log[-1]['pack_health']
+            if n_steps > 0:
+                avg_soc = status_log['pack_soc'].mean()
+                avg_temp = status_log['max_temperature'].mean()
+                avg_imbalance = status_log['voltage_imbalance'].mean()
+                latest_health = status_log['pack_health'][-1]
                 
                 f.write(f"Overall statistics:\n")
                 f.write(f"- Average SoC: {avg_soc:.1f}%\n")
@@ -345,8 +703,9 @@ class BatteryManagementSystem:
                 f.write(f"- Current pack health: {latest_health:.1f}%\n\n")
             
             # Fault counts
-            fault_count = sum(1 for s in self.status_log if s['fault_detected'])
-            warning_count = sum(len(s['warnings']) for s in self.status_log)
+            fault_count = int(status_log['fault_detected'].sum())
+            warning_flags = np.ascontiguousarray(status_log['warning_flags'])
+            warning_count = int(np.unpackbits(warning_flags.view(np.uint8)).sum())
             
             f.write(f"Safety statistics:\n")
             f.write(f"- Total faults detected: {fault_count}\n")
@@ -354,18 +713,20 @@ class BatteryManagementSystem:
             
             # Recent warnings
             f.write("Most recent warnings:\n")
-            for status in reversed(self.status_log[-10:]):
-                if status['warnings']:
-                    f.write(f"- {status['timestamp']}: {' | '.join(status['warnings'])}\n")
+            for i in reversed(range(max(n_steps - 10, 0), n_steps)):
+                status = status_log[i]
+                if status['warning_flags']:
+                    timestamp = self.battery_pack._t0 + timedelta(seconds=int(status['sim_seconds']))
+                    f.write(f"- {timestamp}: {' | '.join(self.decode_warnings(status))}\n")
             
             f.write("\n===== End of Report =====\n")
         
         print(f"Report saved to logs/{filename}")
 
-def run_simulation():
-    """Run a battery simulation with typical usage patterns"""
+def run_simulation(seed=None):
+    """Run a battery simulation with typical usage patterns (seed makes the run reproducible)"""
     # Create battery pack
-    battery_pack = BatteryPack(cells_in_series=12, cells_in_parallel=4)
+    battery_pack = BatteryPack(cells_in_series=12, cells_in_parallel=4, seed=seed)
     
     # Create BMS
     bms = BatteryManagementSystem(battery_pack)
@@ -373,6 +734,7 @@ def run_simulation():
     # Simulation parameters
     simulation_duration = 24 * 3600  # 24 hours in seconds
     time_step = 60  # 1 minute steps
+    battery_pack.prealloc_log(simulation_duration // time_step)
     
     print("Starting Battery Management System Simulation...")
     print(f"Battery Pack: {battery_pack.cells_in_series}S{battery_pack.cells_in_parallel}P configuration")
@@ -390,32 +752,27 @@ def run_simulation():
         {'start': 16 * 3600, 'end': 18 * 3600, 'current': 15}  # Charging
     ]
     
-    # Run simulation
-    current_time = 0
-    while current_time < simulation_duration:
-        # Determine current based on usage profile
-        requested_current = 0
-        for profile in usage_profiles:
-            if profile['start'] <= current_time % (24 * 3600) < profile['end']:
-                requested_current = profile['current']
-                break
-        
-        # Set charging state if current is positive
-        bms.is_charging = requested_current > 0
-        
-        # Determine actual current based on BMS controls
-        if requested_current > 0:
-            # Charging
-            actual_current = bms.control_charging(battery_pack.update(0, 0))  # Get state without updating
-        else:
-            # Discharging
-            actual_current = bms.control_discharging(battery_pack.update(0, 0), abs(requested_current))
-        
-        # Update battery pack
-        pack_state = battery_pack.update(actual_current, time_step)
+    # Requested current for every time step of the day, looked up by step index
+    seconds_per_day = 24 * 3600
+    profile_currents = np.zeros(seconds_per_day // time_step, dtype=np.int8)
+    for profile in usage_profiles:
+        profile_currents[profile['start'] // time_step:profile['end'] // time_step] = profile['current']
+    
+    # Run simulation: pack physics and BMS current control for the whole horizon in one pass
+    n_steps = simulation_duration // time_step
+    requested_currents = profile_currents[np.arange(n_steps) % len(profile_currents)]
+    is_charging, warning_flags = battery_pack.simulate(requested_currents, time_step, bms)
+    pack_currents = battery_pack.data_log['pack_current']
+    first_step = len(pack_currents) - n_steps
+    
+    for step in range(n_steps):
+        current_time = step * time_step
+        pack_state = battery_pack.logged_state(first_step + step)
+        actual_current = pack_currents[first_step + step]
         
         # Monitor and control via BMS
-        bms_status = bms.monitor(pack_state)
+        bms.is_charging = is_charging[step]
+        bms_status = bms.monitor(pack_state, warning_flags[step])
         balancing = bms.balance_cells(pack_state)
         
         # Print status at regular intervals
@@ -425,14 +782,11 @@ def run_simulation():
             print(f"Temperature: {pack_state['avg_temperature']:.1f}°C (max: {pack_state['max_temperature']:.1f}°C)")
             print(f"Current: {actual_current:.2f}A")
             
-            if bms_status['warnings']:
-                print("Warnings:", bms_status['warnings'])
+            if bms_status['warning_flags']:
+                print("Warnings:", bms.decode_warnings(bms_status))
             
             if balancing:
                 print("Cell balancing active:", balancing)
-        
-        # increment time
-        current_time += time_step
     
     # Generate report
     bms.generate_report()
@@ -443,33 +797,93 @@ def run_simulation():
     # Visualize results
     visualize_results(battery_pack.data_log)
 
-def visualize_results(data_log):
-    """Create visualization of battery data"""
-    # Convert data to DataFrame
-    df = pd.DataFrame(data_log)
+def run_batch(configs, requested_current, time_step=60):
+    """Simulate several independent battery packs over the same requested-current profile in parallel.
+    
+    configs is a list of BatteryPack keyword arguments (e.g. cells_in_series, cells_in_parallel,
+    seed); each pack is controlled by a BMS with default thresholds. Returns the BMS of every pack,
+    each with its status log and its pack (battery_pack) with its data log."""
+    if not configs:
+        return []
+    requested_current = np.asarray(requested_current, dtype=np.float64)
+    n_steps = requested_current.size
+    systems = [BatteryManagementSystem(BatteryPack(**config)) for config in configs]
+    packs = [bms.battery_pack for bms in systems]
+    
+    # Concatenate the cells of all packs and make each pack's arrays views into the shared storage,
+    # so the kernel's in-place updates land in the packs
+    cell_offsets = np.cumsum([0] + [pack.total_cells for pack in packs])
+    cell_fields = ('capacity', 'internal_resistance', '_inv_energy_denom', 'soc', 'temperature', 'health', 'voltage')
+    cells = {field: np.concatenate([getattr(pack, field).ravel() for pack in packs]) for field in cell_fields}
+    for k, pack in enumerate(packs):
+        for field in cell_fields:
+            view = cells[field][cell_offsets[k]:cell_offsets[k + 1]]
+            setattr(pack, field, view.reshape(pack.cells_in_series, pack.cells_in_parallel))
+    
+    # One log slice per pack, so threads never share output
+    log_buffers = np.empty((len(packs), len(LOG_FIELDS), n_steps), dtype=STATE_DTYPE)
+    log_seconds = np.empty((len(packs), n_steps), dtype=np.int32)
+    for k, pack in enumerate(packs):
+        pack._bind_log(log_buffers[k], log_seconds[k])
+    
+    # Per-pack parameters, initial state and BMS thresholds
+    pack_params = np.array([[pack.min_voltage, pack.max_voltage, pack.thermal_resistance, pack.heat_capacity,
+                             pack.get_state()['pack_soc'], pack.get_state()['max_temperature']]
+                            for pack in packs], dtype=np.float64)
+    limits = np.array([[bms.max_temperature, bms.max_voltage_imbalance, bms.min_cell_voltage,
+                        bms.max_cell_voltage, bms.min_soc, bms.max_soc] for bms in systems], dtype=np.float64)
+    cells_in_parallel = np.array([pack.cells_in_parallel for pack in packs], dtype=np.int64)
+    fault = np.array([bms.fault_detected for bms in systems], dtype=np.bool_)
+    is_charging = np.zeros((len(packs), n_steps), dtype=np.bool_)
+    warning_flags = np.zeros((len(packs), n_steps), dtype=np.uint16)
+    
+    _simulate_batch(requested_current, float(time_step), cells['capacity'], cells['internal_resistance'],
+                    cells['_inv_energy_denom'], cells['soc'], cells['temperature'], cells['health'],
+                    cells['voltage'], cell_offsets, cells_in_parallel, pack_params[:, 0], pack_params[:, 1],
+                    pack_params[:, 2], pack_params[:, 3], pack_params[:, 4], pack_params[:, 5], fault,
+                    limits, log_buffers, log_seconds, is_charging, warning_flags)
+    
+    # Monitor each pack's logged states with the kernel's warning flags, as run_simulation does,
+    # so every BMS ends up with its status log and final fault and charging state
+    for k, bms in enumerate(systems):
+        pack = bms.battery_pack
+        pack._advance_log(n_steps)
+        for step in range(n_steps):
+            bms.is_charging = is_charging[k, step]
+            bms.monitor(pack.logged_state(step), warning_flags[k, step])
+    return systems
+
+def visualize_results(data_log, max_points=4000):
+    """Create visualization of battery data, downsampled to at most max_points per series"""
+    # Downsample long logs (the figures cannot resolve more points than this anyway) and plot the
+    # arrays directly; x stays in logged steps
+    n_steps = len(data_log['pack_soc'])
+    stride = max(1, -(-n_steps // max_points))
+    x = np.arange(0, n_steps, stride)
+    data = {field: np.asarray(values)[::stride] for field, values in data_log.items()}
     
     # Create figure
-    plt.figure(figsize=(16, 12))
+    plt.figure(figsize=(16, 12), dpi=100)
     
     # Plot 1: SoC and Voltage
     plt.subplot(3, 1, 1)
-    plt.plot(range(len(df)), df['pack_soc'], 'b-', label='State of Charge (%)')
+    plt.plot(x, data['pack_soc'], 'b-', label='State of Charge (%)')
     plt.ylabel('State of Charge (%)')
     plt.legend(loc='upper left')
     
     plt.twinx()
-    plt.plot(range(len(df)), df['pack_voltage'], 'r-', label='Pack Voltage (V)')
+    plt.plot(x, data['pack_voltage'], 'r-', label='Pack Voltage (V)')
     plt.ylabel('Voltage (V)')
     plt.legend(loc='upper right')
     plt.title('Battery State of Charge and Voltage')
     
     # Plot 2: Current
     plt.subplot(3, 1, 2)
-    plt.plot(range(len(df)), df['pack_current'], 'g-', label='Current (A)')
+    plt.plot(x, data['pack_current'], 'g-', label='Current (A)')
     plt.axhline(y=0, color='k', linestyle='-', alpha=0.3)
-    plt.fill_between(range(len(df)), df['pack_current'], 0, where=(df['pack_current'] > 0), 
+    plt.fill_between(x, data['pack_current'], 0, where=(data['pack_current'] > 0), 
                      color='g', alpha=0.3, label='Charging')
-    plt.fill_between(range(len(df)), df['pack_current'], 0, where=(df['pack_current'] < 0), 
+    plt.fill_between(x, data['pack_current'], 0, where=(data['pack_current'] < 0), 
                      color='r', alpha=0.3, label='Discharging')
     plt.ylabel('Current (A)')
     plt.legend()
@@ -477,14 +891,14 @@ def visualize_results(data_log):
     
     # Plot 3: Temperature and Cell Balance
     plt.subplot(3, 1, 3)
-    plt.plot(range(len(df)), df['avg_temperature'], 'r-', label='Avg Temperature (°C)')
-    plt.fill_between(range(len(df)), df['min_temperature'], df['max_temperature'], 
+    plt.plot(x, data['avg_temperature'], 'r-', label='Avg Temperature (°C)')
+    plt.fill_between(x, data['min_temperature'], data['max_temperature'], 
                      color='r', alpha=0.2, label='Temperature Range')
     plt.ylabel('Temperature (°C)')
     plt.legend(loc='upper left')
     
     plt.twinx()
-    plt.plot(range(len(df)), df['voltage_imbalance'], 'b-', label='Voltage Imbalance (V)')
+    plt.plot(x, data['voltage_imbalance'], 'b-', label='Voltage Imbalance (V)')
     plt.ylabel('Voltage Imbalance (V)')
     plt.legend(loc='upper right')
     plt.title('Battery Temperature and Cell Imbalance')
@@ -494,8 +908,8 @@ def visualize_results(data_log):
     plt.close()
     
     # Create another figure for health metrics
-    plt.figure(figsize=(10, 6))
-    plt.plot(range(len(df)), df['pack_health'], 'g-', label='Pack Health (%)')
+    plt.figure(figsize=(10, 6), dpi=100)
+    plt.plot(x, data['pack_health'], 'g-', label='Pack Health (%)')
     plt.ylabel('Health (%)')
     plt.xlabel('Time (minutes)')
     plt.title('Battery Pack Health Over Time')
@@ -505,5 +919,13 @@ def visualize_results(data_log):
     
     print("Visualizations saved to logs/ directory")
 
+def _warm_up():
+    """Compile the Numba kernels on a throwaway pack so the first simulation step is not delayed"""
+    pack = BatteryPack(cells_in_series=1, cells_in_parallel=1)
+    pack.update(0, 0)
+    bms = BatteryManagementSystem(pack)
+    pack.simulate([-1, 1], 60, bms)  # one discharge and one charge step
+
 if __name__ == "__main__":
+    _warm_up()
     run_simulation()